@@ -0,0 +1,26 @@
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler, set_rollback
+
+logger = logging.getLogger(__name__)
+
+
+def exception_handler(exc, context):
+    """
+    DRF's handler for APIException/Http404/PermissionDenied; anything else is
+    logged and answered with a fixed 500 body, so internals never leak into
+    responses and views don't need their own catch-all try/except.
+    """
+    response = drf_exception_handler(exc, context)
+    if response is not None:
+        return response
+
+    view = context.get("view")
+    logger.exception("Unhandled error in %s", type(view).__name__ if view else "view", exc_info=exc)
+    set_rollback()
+    return Response(
+        {"error": "An unexpected error occurred"},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    )
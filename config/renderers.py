@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+from datasets.analytics import orjson_default, to_json
+
+
+def _default(v):
+    # Types DRF's own JSON encoder accepts that orjson does not.
+    if isinstance(v, Promise):
+        return str(v)
+    if isinstance(v, Decimal):
+        return float(v)
+    return orjson_default(v)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson (via analytics.to_json), so response bodies
+    are serialized in C; numpy values and NaN are handled the same way as in
+    stored summaries.
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return to_json(data, default=_default)
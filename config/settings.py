@@ -102,6 +102,15 @@ WSGI_APPLICATION = "config.wsgi.application"
 # -----------------------------------------------------------------------------
 # Password validation
 # -----------------------------------------------------------------------------
+# Argon2id first: new and upgraded hashes use it; PBKDF2 stays so existing
+# hashes still verify (and are re-hashed on the next successful login).
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -133,6 +142,30 @@ STORAGES = {
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# -----------------------------------------------------------------------------
+# Cache
+# -----------------------------------------------------------------------------
+# Per-process memory cache: each gunicorn worker has its own copy and nothing
+# is shared between them. Cached dataset history carries a version read from
+# the database, so a worker notices writes made by any process.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fossee-default",
+    }
+}
+
+# -----------------------------------------------------------------------------
+# Dataset uploads
+# -----------------------------------------------------------------------------
+# Requests over MAX_UPLOAD_BYTES (by Content-Length) or with more than
+# MAX_UPLOAD_ROWS records are rejected with 413.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_UPLOAD_ROWS = int(os.getenv("MAX_UPLOAD_ROWS", "100000"))
+# History responses larger than this are served uncached, so a few maximum-size
+# datasets can't pin hundreds of MB per worker in the cache.
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(5 * 1024 * 1024)))
+
 # -----------------------------------------------------------------------------
 # DRF
 # -----------------------------------------------------------------------------
@@ -144,11 +177,24 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # orjson-backed JSON for every view; the browsable API only in DEBUG.
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.renderers.ORJSONRenderer",
+        *(["rest_framework.renderers.BrowsableAPIRenderer"] if DEBUG else []),
+    ],
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
         "rest_framework.parsers.FormParser",
         "rest_framework.parsers.MultiPartParser",
     ],
+    "EXCEPTION_HANDLER": "config.exceptions.exception_handler",
+    # Throttle counters live in the default cache. With the per-process
+    # LocMemCache above each gunicorn worker counts separately, so the
+    # effective limit is rate x workers; use a shared cache for a global one.
+    "DEFAULT_THROTTLE_RATES": {
+        "login": os.getenv("LOGIN_THROTTLE_RATE", "10/min"),
+        "login_ip": os.getenv("LOGIN_IP_THROTTLE_RATE", "30/min"),
+    },
 }
 
 # -----------------------------------------------------------------------------
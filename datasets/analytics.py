@@ -1,105 +1,186 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
 import pandas as pd
 import numpy as np
-import math
 
-def _py(v):
-    if v is None:
-        return None
-    try:
-        if pd.isna(v):
-            return None
-    except Exception:
-        pass
-    if isinstance(v, (np.integer,)):
-        return int(v)
-    if isinstance(v, (np.floating,)):
-        x = float(v)
-        if math.isfinite(x):
-            return x
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Canonical record keys, shared with views. "Equipment Name" has a space, so
+# CPython does not intern it on its own; interning makes every normalized
+# record and the _RECORD_COLUMNS lookups share one key object.
+KEY_NAME = sys.intern("Equipment Name")
+KEY_TYPE = sys.intern("Type")
+KEY_FLOW = sys.intern("Flowrate")
+KEY_PRESS = sys.intern("Pressure")
+KEY_TEMP = sys.intern("Temperature")
+
+# LRU of analyze_equipment_json results keyed by SHA-256 of the records.
+# Results carry per-row SeriesData, so the cache is bounded by rows as well
+# as entries: datasets over _ANALYSIS_CACHE_MAX_ROWS are never cached, and
+# the oldest entries go once the cached total passes _ANALYSIS_CACHE_ROW_BUDGET.
+_ANALYSIS_CACHE_SIZE = 128
+_ANALYSIS_CACHE_MAX_ROWS = 5_000
+_ANALYSIS_CACHE_ROW_BUDGET = 100_000
+_ANALYSIS_CACHE = OrderedDict()  # key -> (rows, result)
+_ANALYSIS_CACHE_ROWS = 0
+_ANALYSIS_CACHE_LOCK = threading.Lock()
+
+_PARALLEL_MIN_ROWS = 10_000
+_COLUMN_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="analytics")
+
+def orjson_default(v):
+    """
+    orjson `default` hook for numpy scalars and pandas NA/NaT; other types
+    raise TypeError as orjson expects.
+    """
+    if isinstance(v, np.generic):
+        return v.item()
+    if v is pd.NA or v is pd.NaT:
         return None
-    if isinstance(v, (int, float)):
-        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
-            return None
-        return v
-    if isinstance(v, (list, tuple)):
-        return [_py(x) for x in v]
-    if isinstance(v, dict):
-        return {str(k): _py(val) for k, val in v.items()}
-    return v
-
-def _json_safe(obj):
-    return _py(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(v).__name__}")
+
+def to_json(obj, default=orjson_default) -> bytes:
+    """
+    Serializes an analytics result (which may hold numpy scalars/arrays and
+    NaN/inf) to JSON bytes. orjson writes non-finite floats as null.
+    """
+    return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+
+def json_safe(obj):
+    """
+    Plain-Python, JSON-safe copy of `obj` (numpy -> builtins, NaN -> None).
+    """
+    return orjson.loads(to_json(obj))
 
 def _pretty_edges_labels(edges, decimals=0, sep="–"):
     """
     edges: list/np array of bin edges length = bins+1
     returns labels: ["a–b", ...]
     """
-    labels = []
-    for i in range(len(edges) - 1):
-        a = round(float(edges[i]), decimals)
-        b = round(float(edges[i + 1]), decimals)
-        if decimals == 0:
-            a = int(a)
-            b = int(b)
-        labels.append(f"{a}{sep}{b}")
-    return labels
-
-def _hist_counts(series: pd.Series, bins=5):
+    rounded = np.round(np.asarray(edges, dtype=np.float64), decimals)
+    if decimals == 0:
+        rounded = rounded.astype(np.int64)
+    vals = rounded.tolist()
+    return [f"{a}{sep}{b}" for a, b in zip(vals[:-1], vals[1:])]
+
+def _dropna(arr: np.ndarray):
+    return arr[~np.isnan(arr)]
+
+def _mean(arr: np.ndarray):
+    s = _dropna(arr)
+    return s.mean() if s.size else np.nan
+
+def _hist_counts(arr: np.ndarray, bins=5):
     """
     Returns (edges, counts) using numpy histogram.
     """
-    s = series.dropna()
-    if s.empty:
+    s = _dropna(arr)
+    if not s.size:
         return None, [0] * bins
 
-    counts, edges = np.histogram(s.to_numpy(dtype=float), bins=bins)
+    counts, edges = np.histogram(s, bins=bins)
     return edges, counts.tolist()
 
-def _stats(df: pd.DataFrame, col: str):
-    s = df[col].dropna()
-    if s.empty:
-        return {
-            "count": 0,
-            "mean": None,
-            "std": None,
-            "min": None,
-            "q1": None,
-            "median": None,
-            "q3": None,
-            "max": None,
-        }
+def _empty_stats():
+    return {
+        "count": 0,
+        "mean": None,
+        "std": None,
+        "min": None,
+        "q1": None,
+        "median": None,
+        "q3": None,
+        "max": None,
+    }
+
+def _stats(arr: np.ndarray):
+    s = _dropna(arr)
+    if not s.size:
+        return _empty_stats()
+    mn, q1, med, q3, mx = np.quantile(s, [0, 0.25, 0.5, 0.75, 1]).tolist()
     return {
-        "count": int(s.count()),
+        "count": int(s.size),
         "mean": float(s.mean()),
-        "std": float(s.std(ddof=1)) if s.count() > 1 else 0.0,
-        "min": float(s.min()),
-        "q1": float(s.quantile(0.25)),
-        "median": float(s.median()),
-        "q3": float(s.quantile(0.75)),
-        "max": float(s.max()),
+        "std": float(s.std(ddof=1)) if s.size > 1 else 0.0,
+        "min": mn,
+        "q1": q1,
+        "median": med,
+        "q3": q3,
+        "max": mx,
     }
 
-def _iqr_outliers(series: pd.Series):
-    s = series.dropna()
-    if s.empty:
+def _map_columns(fn, arrays: list):
+    """
+    Applies `fn` to each column array. Large inputs run on a thread pool:
+    NumPy's sorting and reductions release the GIL, so the columns proceed in
+    parallel. Small inputs stay serial, where dispatch would cost more.
+    """
+    if len(arrays[0]) < _PARALLEL_MIN_ROWS:
+        return [fn(a) for a in arrays]
+    return list(_COLUMN_POOL.map(fn, arrays))
+
+def _grouped_stats(df: pd.DataFrame, key: str, cols: list):
+    """
+    Same shape as calling `_stats` on every (group, column) pair, but the
+    reductions run as one grouped aggregation plus one grouped quantile.
+
+    Returns: {group: {col: stats_dict}}
+    """
+    gb = df.groupby(key, dropna=True, observed=True)[cols]
+    agg_df = gb.agg(["count", "mean", "std", "min", "max"])
+    if agg_df.empty:
+        return {}
+
+    q_df = gb.quantile([0.25, 0.5, 0.75]).unstack()
+    q_df = q_df.reindex(columns=pd.MultiIndex.from_product([cols, [0.25, 0.5, 0.75]]))
+    agg_df = agg_df.reindex(columns=pd.MultiIndex.from_product([cols, ["count", "mean", "std", "min", "max"]]))
+
+    out = {}
+    for t, a, q in zip(agg_df.index, agg_df.itertuples(index=False), q_df.itertuples(index=False)):
+        group = {}
+        for i, col in enumerate(cols):
+            count, mean, std, mn, mx = a[i * 5:i * 5 + 5]
+            q1, med, q3 = q[i * 3:i * 3 + 3]
+            if count == 0:
+                group[col] = _empty_stats()
+                continue
+            group[col] = {
+                "count": int(count),
+                "mean": float(mean),
+                "std": float(std) if count > 1 else 0.0,
+                "min": float(mn),
+                "q1": float(q1),
+                "median": float(med),
+                "q3": float(q3),
+                "max": float(mx),
+            }
+        out[str(t)] = group
+    return out
+
+def _iqr_outliers(arr: np.ndarray):
+    s = _dropna(arr)
+    if not s.size:
         return {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []}
 
-    q1 = s.quantile(0.25)
-    med = s.median()
-    q3 = s.quantile(0.75)
+    # One partition yields all five points; min/max are the 0/1 quantiles.
+    mn, q1, med, q3, mx = np.quantile(s, [0, 0.25, 0.5, 0.75, 1]).tolist()
     iqr = q3 - q1
     low = q1 - 1.5 * iqr
     high = q3 + 1.5 * iqr
     outs = s[(s < low) | (s > high)].tolist()
 
     return {
-        "min": float(s.min()),
-        "q1": float(q1),
-        "median": float(med),
-        "q3": float(q3),
-        "max": float(s.max()),
-        "outliers": [float(x) for x in outs],
+        "min": mn,
+        "q1": q1,
+        "median": med,
+        "q3": q3,
+        "max": mx,
+        "outliers": outs,
     }
 
 def _pressure_boxplot_each_equipment(df: pd.DataFrame):
@@ -121,78 +202,120 @@ def _pressure_boxplot_each_equipment(df: pd.DataFrame):
       min=q1=median=q3=max=that single value.
     - If equipment repeats across time/uploads, this becomes a real distribution.
     """
-    labels = []
-    values = []
-
-    for name, g in df.groupby("name", dropna=True):
-        s = g["pressure"].dropna()
-        if s.empty:
-            continue
+    return _pressure_quantiles_by(df, "name")
 
-        q = s.quantile([0, 0.25, 0.5, 0.75, 1]).tolist()
-        labels.append(str(name))
-        values.append([float(x) for x in q])
+def _pressure_boxplot_by_type(df: pd.DataFrame):
+    return _pressure_quantiles_by(df, "type")
 
-    paired = sorted(zip(labels, values), key=lambda x: x[0].lower())
-    labels = [p[0] for p in paired]
-    values = [p[1] for p in paired]
+def _pressure_quantiles_by(df: pd.DataFrame, key: str):
+    """
+    Five-number pressure summary per `key` group, computed in one grouped
+    quantile call. Labels are sorted case-insensitively.
+    """
+    s = df.dropna(subset=["pressure"])
+    if s.empty:
+        return {"labels": [], "values": []}
 
-    return {"labels": labels, "values": values}
+    q = s.groupby(key, dropna=True, observed=True)["pressure"].quantile([0, 0.25, 0.5, 0.75, 1]).unstack()
 
-def _pressure_boxplot_by_type(df: pd.DataFrame):
-    labels = []
-    values = []
-
-    for t, g in df.groupby("type", dropna=True):
-        s = g["pressure"].dropna()
-        if s.empty:
-            continue
-        q = s.quantile([0, 0.25, 0.5, 0.75, 1]).tolist()
-        labels.append(str(t))
-        values.append([float(x) for x in q])
-
-    paired = sorted(zip(labels, values), key=lambda x: x[0].lower())
+    paired = sorted(zip(q.index.map(str), q.to_numpy(dtype=float).tolist()), key=lambda x: x[0].lower())
     return {"labels": [p[0] for p in paired], "values": [p[1] for p in paired]}
 
-def _series_list(series: pd.Series, max_points: int | None = None):
+def _series_list(arr: np.ndarray, max_points: int | None = None):
     """
-    Returns a list of floats (or None for missing).
+    Returns a float64 array (NaN for missing; `to_json` writes it as null).
     If max_points is provided and data is larger, downsample uniformly.
     """
-    s = series.copy()
-    arr = [None if pd.isna(x) else float(x) for x in s.tolist()]
-
     if max_points is None or len(arr) <= max_points:
         return arr
 
     idx = np.linspace(0, len(arr) - 1, max_points).astype(int)
-    return [arr[i] for i in idx]
+    return arr[idx]
 
-def analyze_equipment_json(records: list):
-    df = pd.DataFrame(records)
+_RECORD_COLUMNS = {
+    KEY_NAME: "name",
+    KEY_TYPE: "type",
+    KEY_FLOW: "flowrate",
+    KEY_PRESS: "pressure",
+    KEY_TEMP: "temperature",
+}
 
-    df = df.rename(columns={
-        "Equipment Name": "name",
-        "Type": "type",
-        "Flowrate": "flowrate",
-        "Pressure": "pressure",
-        "Temperature": "temperature",
-    })
+def equipment_frame(records: list) -> pd.DataFrame:
+    """
+    DataFrame of normalized records, one column per record key. Keys a record
+    lacks come through as NaN.
+    """
+    return pd.DataFrame.from_records(records, columns=list(_RECORD_COLUMNS))
 
-    for col in ["name", "type", "flowrate", "pressure", "temperature"]:
-        if col not in df.columns:
-            df[col] = None
+def analyze_equipment_json(records: list, frame: pd.DataFrame | None = None):
+    """
+    Analytics for a list of normalized equipment records.
 
-    for col in ["flowrate", "pressure", "temperature"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    `frame` may be passed when the caller already built `equipment_frame(records)`.
+
+    Results for datasets of up to _ANALYSIS_CACHE_MAX_ROWS records are cached
+    by a hash of the records, so re-uploading the same dataset skips the
+    analysis. Callers must not mutate the returned dict.
+    """
+    global _ANALYSIS_CACHE_ROWS
+
+    rows = len(records)
+    if rows > _ANALYSIS_CACHE_MAX_ROWS:
+        return _analyze_frame(equipment_frame(records) if frame is None else frame)
+
+    key = hashlib.sha256(orjson.dumps(records, option=orjson.OPT_SORT_KEYS)).digest()
+    with _ANALYSIS_CACHE_LOCK:
+        cached = _ANALYSIS_CACHE.get(key)
+        if cached is not None:
+            _ANALYSIS_CACHE.move_to_end(key)
+            return cached[1]
+
+    result = _analyze_frame(equipment_frame(records) if frame is None else frame)
+    # SeriesData holds views into the frame's float block; cache owned copies
+    # so an entry keeps only its two series alive.
+    cached_result = {
+        **result,
+        "SeriesData": {k: np.array(v) for k, v in result["SeriesData"].items()},
+    }
+
+    with _ANALYSIS_CACHE_LOCK:
+        if key not in _ANALYSIS_CACHE:
+            _ANALYSIS_CACHE[key] = (rows, cached_result)
+            _ANALYSIS_CACHE_ROWS += rows
+        while _ANALYSIS_CACHE and (
+            len(_ANALYSIS_CACHE) > _ANALYSIS_CACHE_SIZE
+            or _ANALYSIS_CACHE_ROWS > _ANALYSIS_CACHE_ROW_BUDGET
+        ):
+            _ANALYSIS_CACHE_ROWS -= _ANALYSIS_CACHE.popitem(last=False)[1][0]
+    return result
+
+def _analyze_frame(frame: pd.DataFrame):
+    # Records come from _normalize_equipment_record, so the numeric fields are
+    # already float/None and a plain cast replaces per-column to_numeric.
+    # rename() copies, so the caller's frame is left untouched.
+    df = frame.rename(columns=_RECORD_COLUMNS)
+
+    num_cols = ["flowrate", "pressure", "temperature"]
+    df[num_cols] = df[num_cols].astype(np.float64)
+    # Every grouping below is by type; categorical codes make those integer
+    # groupbys instead of re-hashing the strings each time.
+    df["type"] = df["type"].astype("category")
 
     total_count = int(len(df))
 
-    avg_flowrate = df["flowrate"].mean()
-    avg_pressure = df["pressure"].mean()
-    avg_temperature = df["temperature"].mean()
+    # Materialize each numeric column once; everything below works on these.
+    fl = df["flowrate"].to_numpy(dtype=np.float64)
+    pr = df["pressure"].to_numpy(dtype=np.float64)
+    tp = df["temperature"].to_numpy(dtype=np.float64)
+
+    avg_flowrate = _mean(fl)
+    avg_pressure = _mean(pr)
+    avg_temperature = _mean(tp)
 
-    type_distribution = df["type"].value_counts(dropna=True).to_dict()
+    # Counted on the categorical codes; the > 0 filter drops unobserved
+    # categories.
+    type_counts = df["type"].value_counts(dropna=True)
+    type_distribution = type_counts[type_counts > 0].to_dict()
 
     clean_scatter = df.dropna(subset=["flowrate", "pressure", "temperature"])
     if len(clean_scatter) > 0:
@@ -200,19 +323,18 @@ def analyze_equipment_json(records: list):
     else:
         sample_df = clean_scatter
 
-    scatter_points = sample_df.apply(
-        lambda r: {
-            "x": round(r["flowrate"], 2),
-            "y": round(r["pressure"], 2),
-            "t": round(r["temperature"], 2),
-        },
-        axis=1
-    ).tolist()
+    sx = np.round(sample_df["flowrate"].to_numpy(dtype=np.float64), 2)
+    sy = np.round(sample_df["pressure"].to_numpy(dtype=np.float64), 2)
+    st = np.round(sample_df["temperature"].to_numpy(dtype=np.float64), 2)
+    scatter_points = [
+        {"x": x, "y": y, "t": t}
+        for x, y, t in zip(sx.tolist(), sy.tolist(), st.tolist())
+    ]
 
     bins = 5
 
-    flow_edges, flow_counts = _hist_counts(df["flowrate"], bins=bins)
-    temp_edges, temp_counts = _hist_counts(df["temperature"], bins=bins)
+    flow_edges, flow_counts = _hist_counts(fl, bins=bins)
+    temp_edges, temp_counts = _hist_counts(tp, bins=bins)
 
     edges_for_labels = flow_edges if flow_edges is not None else temp_edges
 
@@ -222,86 +344,74 @@ def analyze_equipment_json(records: list):
         "temperature": temp_counts,
     }
 
-    boxplot = {
-        "labels": ["Flowrate", "Pressure", "Temperature"],
-        "values": [
-            df["flowrate"].quantile([0, .25, .5, .75, 1]).tolist(),
-            df["pressure"].quantile([0, .25, .5, .75, 1]).tolist(),
-            df["temperature"].quantile([0, .25, .5, .75, 1]).tolist(),
-        ],
-    }
-
     PressureBoxplotByEquipment = _pressure_boxplot_by_type(df)
 
-    corr = df[["flowrate", "pressure", "temperature"]].corr()
+    # One correlation pass shared by `correlation` and `CorrelationInsights`.
+    corr_labels = ["Flowrate", "Pressure", "Temperature"]
+    corr = np.nan_to_num(df[num_cols].corr().to_numpy(), nan=0.0, copy=False)
     correlation = [
         {
-            "x": i.capitalize() if i != "flowrate" else "Flowrate",
-            "y": j.capitalize() if j != "flowrate" else "Flowrate",
-            "v": round(float(corr.loc[i, j]), 4) if pd.notna(corr.loc[i, j]) else 0.0
+            "x": corr_labels[i],
+            "y": corr_labels[j],
+            "v": round(float(corr[i, j]), 4),
         }
-        for i in corr.columns
-        for j in corr.columns
+        for i in range(3)
+        for j in range(3)
     ]
 
+    fl_stats, pr_stats, tp_stats = _map_columns(_stats, [fl, pr, tp])
     statistical_summary = {
         "data": {
-            "flowrate": _stats(df, "flowrate"),
-            "pressure": _stats(df, "pressure"),
-            "temperature": _stats(df, "temperature"),
+            "flowrate": fl_stats,
+            "pressure": pr_stats,
+            "temperature": tp_stats,
         }
     }
 
-    grouped = {}
-    for t, g in df.groupby("type", dropna=True):
-        grouped[str(t)] = {
-            "flowrate": _stats(g, "flowrate"),
-            "pressure": _stats(g, "pressure"),
-            "temperature": _stats(g, "temperature"),
-        }
+    grouped = _grouped_stats(df, "type", ["flowrate", "pressure", "temperature"])
 
-    dist_stats = _iqr_outliers(df["flowrate"])
+    dist_stats = _iqr_outliers(fl)
     DistributionAnalysis = {
         "title": "Flowrate",
         "unit": " m³/h",
         "stats": dist_stats
     }
 
-    corr2 = df[["flowrate", "pressure", "temperature"]].corr().fillna(0.0)
     CorrelationInsights = {
         "matrix": {
             "Flowrate": {
                 "Flowrate": 1.0,
-                "Pressure": float(corr2.loc["flowrate", "pressure"]),
-                "Temperature": float(corr2.loc["flowrate", "temperature"]),
+                "Pressure": float(corr[0, 1]),
+                "Temperature": float(corr[0, 2]),
             },
             "Pressure": {
-                "Flowrate": float(corr2.loc["pressure", "flowrate"]),
+                "Flowrate": float(corr[1, 0]),
                 "Pressure": 1.0,
-                "Temperature": float(corr2.loc["pressure", "temperature"]),
+                "Temperature": float(corr[1, 2]),
             },
             "Temperature": {
-                "Flowrate": float(corr2.loc["temperature", "flowrate"]),
-                "Pressure": float(corr2.loc["temperature", "pressure"]),
+                "Flowrate": float(corr[2, 0]),
+                "Pressure": float(corr[2, 1]),
                 "Temperature": 1.0,
             },
         }
     }
 
-    avg_p = df["pressure"].mean()
-    cond_df = df[df["pressure"] > avg_p] if pd.notna(avg_p) else df.iloc[0:0]
+    # NaN pressures (and a NaN average) compare False, so they never match.
+    cond_mask = pr > avg_pressure
+    cond_n = int(cond_mask.sum())
     ConditionalAnalysis = {
         "conditionLabel": "Records with ABOVE average pressure",
-        "totalRecords": int(len(cond_df)),
+        "totalRecords": cond_n,
         "stats": {
-            "flowrate": float(cond_df["flowrate"].mean()) if len(cond_df) else None,
-            "pressure": float(cond_df["pressure"].mean()) if len(cond_df) else None,
-            "temperature": float(cond_df["temperature"].mean()) if len(cond_df) else None,
+            "flowrate": float(_mean(fl[cond_mask])) if cond_n else None,
+            "pressure": float(_mean(pr[cond_mask])) if cond_n else None,
+            "temperature": float(_mean(tp[cond_mask])) if cond_n else None,
         }
     }
 
     EquipmentPerformanceRanking = {}
-    for t, g in df.groupby("type", dropna=True):
+    for t, g in df.groupby("type", dropna=True, observed=True):
         EquipmentPerformanceRanking[str(t)] = {
             "flowrate": float(g["flowrate"].mean()) if len(g) else None,
             "pressure": float(g["pressure"].mean()) if len(g) else None,
@@ -309,11 +419,15 @@ def analyze_equipment_json(records: list):
         }
 
     SeriesData = {
-        "flowrate": _series_list(df["flowrate"], max_points=None),
-        "temperature": _series_list(df["temperature"], max_points=None)
+        "flowrate": _series_list(fl, max_points=None),
+        "temperature": _series_list(tp, max_points=None)
     }
     
-    preview = df[["name", "type", "flowrate", "pressure", "temperature"]].head(20).to_dict(orient="records")
+    preview_cols = ["name", "type", "flowrate", "pressure", "temperature"]
+    preview = [
+        dict(zip(preview_cols, row))
+        for row in zip(*(df[c].iloc[:20].to_numpy().tolist() for c in preview_cols))
+    ]
 
     result = {
         "total_count": total_count,
@@ -337,4 +451,4 @@ def analyze_equipment_json(records: list):
 
         "data": preview,
     }
-    return _json_safe(result)
\ No newline at end of file
+    return result
\ No newline at end of file
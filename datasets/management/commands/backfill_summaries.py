@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from datasets.analytics import analyze_equipment_json, json_safe
+from datasets.models import Dataset
+
+
+class Command(BaseCommand):
+    help = "Compute and store summaries for datasets that are missing one."
+
+    def handle(self, *args, **options):
+        updated = 0
+        for ds in Dataset.objects.order_by("pk"):
+            summary = ds.summary if isinstance(ds.summary, dict) else {}
+            if summary and int(summary.get("total_count") or 0) > 0:
+                continue
+
+            records = ds.raw_data if isinstance(ds.raw_data, list) else []
+            if not records:
+                continue
+
+            try:
+                ds.summary = json_safe(analyze_equipment_json(records))
+            except Exception as e:
+                self.stderr.write(f"Dataset {ds.pk}: analysis failed ({e})")
+                continue
+
+            # updated_at is part of the history cache version; saving it makes
+            # every worker drop its cached history on the next request.
+            ds.save(update_fields=["summary", "updated_at"])
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} dataset summaries"))
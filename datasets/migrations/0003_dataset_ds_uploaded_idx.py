@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 21:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0002_remove_dataset_file_dataset_raw_data_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['-uploaded_at'], name='ds_uploaded_idx'),
+        ),
+    ]
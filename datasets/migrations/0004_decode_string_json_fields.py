@@ -0,0 +1,37 @@
+import json
+
+from django.db import migrations
+
+
+def decode_string_json(apps, schema_editor):
+    """
+    Uploads used to store json.dumps() output in raw_data/summary, i.e. a JSON
+    string literal wrapping the real payload. Decode those once so readers can
+    use the field values directly.
+    """
+    Dataset = apps.get_model('datasets', 'Dataset')
+    for ds in Dataset.objects.all():
+        changed = []
+        for field in ('raw_data', 'summary'):
+            value = getattr(ds, field)
+            if not isinstance(value, str):
+                continue
+            try:
+                decoded = json.loads(value) if value.strip() else None
+            except ValueError:
+                decoded = None
+            setattr(ds, field, decoded)
+            changed.append(field)
+        if changed:
+            ds.save(update_fields=changed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0003_dataset_ds_uploaded_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(decode_string_json, migrations.RunPython.noop),
+    ]
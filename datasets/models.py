@@ -5,6 +5,10 @@ class Dataset(models.Model):
     raw_data = models.JSONField(null=True, blank=True)
     summary = models.JSONField(null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["-uploaded_at"], name="ds_uploaded_idx")]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,61 @@
+import ijson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+_READ_SIZE = 64 * 1024
+
+
+class StreamingJSONArrayParser(BaseParser):
+    """
+    Parses a top-level JSON array lazily: request.data is an iterator over its
+    elements, so the whole payload is never held as one Python list.
+    Malformed input raises ParseError while iterating.
+
+    Uses ijson's C (yajl2) backend, which only represents integers that fit in
+    64 bits; larger integer literals are rejected as out of range rather than
+    parsed (the pure-Python backend accepts them but is ~15x slower).
+    """
+
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return _iter_array_items(stream)
+
+
+class _PrefixedStream:
+    """File-like object that replays `head` before reading on from `stream`."""
+
+    def __init__(self, head: bytes, stream):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size=-1):
+        # ijson probes with read(0) to detect bytes vs str; don't spend head.
+        if size == 0:
+            return b""
+        if self._head:
+            head, self._head = self._head, b""
+            return head
+        return self._stream.read(size)
+
+
+def _iter_array_items(stream):
+    # Peek past leading whitespace so a non-array body is reported as such
+    # instead of looking like an empty array to ijson.
+    head = b""
+    while not head.strip():
+        chunk = stream.read(_READ_SIZE)
+        if not chunk:
+            break
+        head += chunk
+    if not head.lstrip().startswith(b"["):
+        raise ParseError("Expected a JSON array of equipment records")
+
+    try:
+        yield from ijson.items(_PrefixedStream(head, stream), "item", use_float=True)
+    except ijson.JSONError as exc:
+        # yajl's message is a multi-line dump of the surrounding input; keep
+        # it out of the response.
+        if "integer overflow" in str(exc):
+            raise ParseError("JSON parse error - integer out of range")
+        raise ParseError("JSON parse error - malformed JSON array")
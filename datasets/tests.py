@@ -1,3 +1,165 @@
-from django.test import TestCase
+import io
+import json
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .models import Dataset
+
+RECORD = {"Equipment Name": "P1", "Type": "Pump", "Flowrate": 100.5, "Pressure": 5.2, "Temperature": 110.0}
+
+
+class UploadParserTests(TestCase):
+    """UploadCSVView request bodies, as read by StreamingJSONArrayParser."""
+
+    def post(self, body, content_type="application/json"):
+        return self.client.post(reverse("upload-csv"), data=body, content_type=content_type)
+
+    def assertError(self, response, status_code, error):
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response.json()["error"], error)
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_valid_array_is_stored(self):
+        response = self.post(json.dumps([RECORD, {**RECORD, "Equipment Name": "P2"}]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["total_count"], 2)
+        self.assertEqual(Dataset.objects.get().raw_data[1]["Equipment Name"], "P2")
+
+    def test_non_array_body(self):
+        self.assertError(self.post(json.dumps(RECORD)), 400, "Expected a JSON array of equipment records")
+
+    def test_empty_body(self):
+        self.assertError(self.post(""), 400, "Expected a JSON array of equipment records")
+        self.assertError(self.post("  \n "), 400, "Expected a JSON array of equipment records")
+
+    def test_empty_array(self):
+        self.assertError(self.post("[]"), 400, "Dataset cannot be empty")
+
+    def test_truncated_body(self):
+        self.assertError(self.post(json.dumps([RECORD])[:-5]), 400, "JSON parse error - malformed JSON array")
+
+    def test_trailing_garbage(self):
+        self.assertError(self.post(json.dumps([RECORD]) + " [1]"), 400, "JSON parse error - malformed JSON array")
+
+    def test_invalid_utf8_is_not_echoed(self):
+        self.assertError(self.post(b'[{"Type": "\xff"}]'), 400, "JSON parse error - malformed JSON array")
+
+    def test_integer_beyond_64_bits(self):
+        body = json.dumps([{**RECORD, "Flowrate": 12345678901234567890123}])
+        self.assertError(self.post(body), 400, "JSON parse error - integer out of range")
+
+    def test_overflowing_number_string_fails_validation(self):
+        response = self.post(json.dumps([{**RECORD, "Flowrate": "1e999"}]))
+        self.assertError(response, 400, "Validation failed for some records")
+        self.assertEqual(response.json()["details"][0]["missing"], ["Flowrate"])
+
+    def test_non_object_rows(self):
+        response = self.post(json.dumps([RECORD, 1, "x"]))
+        self.assertError(response, 400, "Validation failed for some records")
+        self.assertEqual([d["row"] for d in response.json()["details"]], [1, 2])
+
+    @override_settings(MAX_UPLOAD_ROWS=2)
+    def test_over_row_cap(self):
+        self.assertError(self.post(json.dumps([RECORD] * 3)), 413, "Dataset exceeds 2 records")
+
+    @override_settings(MAX_UPLOAD_BYTES=100)
+    def test_over_byte_cap(self):
+        self.assertError(self.post(json.dumps([RECORD] * 3)), 413, "Upload exceeds 100 bytes")
+
+
+class HistoryCacheTests(TestCase):
+    """DatasetHistoryView's cached response bodies."""
+
+    cache_key = "datasets:history:5"
+
+    def setUp(self):
+        cache.clear()
+        self.client.post(reverse("upload-csv"), data=json.dumps([RECORD]), content_type="application/json")
+
+    def get_history(self):
+        response = self.client.get(reverse("dataset-history"))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_body_is_cached(self):
+        body = self.get_history()
+        self.assertEqual(json.loads(cache.get(self.cache_key)[1]), body)
+
+    def test_backfilled_summary_is_served(self):
+        ds = Dataset.objects.get()
+        self.assertEqual(self.get_history()["datasets"][str(ds.pk)]["dataset"]["avg_flowrate"], 100.5)
+
+        ds.summary = {}
+        ds.save()
+        self.assertIsNone(self.get_history()["datasets"][str(ds.pk)]["dataset"]["avg_flowrate"])
+
+        call_command("backfill_summaries", stdout=io.StringIO())
+        self.assertEqual(self.get_history()["datasets"][str(ds.pk)]["dataset"]["avg_flowrate"], 100.5)
+
+    def test_upload_and_delete_change_the_version(self):
+        self.get_history()
+        version = cache.get(self.cache_key)[0]
+
+        self.client.post(reverse("upload-csv"), data=json.dumps([RECORD]), content_type="application/json")
+        self.assertEqual(self.get_history()["count"], 2)
+        self.assertNotEqual(cache.get(self.cache_key)[0], version)
+        version = cache.get(self.cache_key)[0]
+
+        Dataset.objects.order_by("uploaded_at").first().delete()
+        self.assertEqual(self.get_history()["count"], 1)
+        self.assertNotEqual(cache.get(self.cache_key)[0], version)
+
+    @override_settings(HISTORY_CACHE_MAX_BYTES=100)
+    def test_oversized_body_is_not_cached(self):
+        self.assertEqual(self.get_history()["count"], 1)
+        self.assertIsNone(cache.get(self.cache_key))
+
+
+class DecodeStringJsonMigrationTests(TransactionTestCase):
+    """0004_decode_string_json_fields turns legacy json.dumps() strings into JSON values."""
+
+    migrate_from = [("datasets", "0003_dataset_ds_uploaded_idx")]
+    migrate_to = [("datasets", "0004_decode_string_json_fields")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        Dataset = executor.loader.project_state(self.migrate_from).apps.get_model("datasets", "Dataset")
+        self.legacy = Dataset.objects.create(
+            name="legacy", raw_data=json.dumps([RECORD]), summary=json.dumps({"total_count": 1})
+        ).pk
+        self.broken = Dataset.objects.create(name="broken", raw_data="{not json", summary="").pk
+        self.native = Dataset.objects.create(name="native", raw_data=[RECORD], summary={"total_count": 1}).pk
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes("datasets"))
+
+    def get(self, pk):
+        return self.apps.get_model("datasets", "Dataset").objects.get(pk=pk)
+
+    def test_string_values_are_decoded(self):
+        ds = self.get(self.legacy)
+        self.assertEqual(ds.raw_data, [RECORD])
+        self.assertEqual(ds.summary, {"total_count": 1})
+
+    def test_invalid_strings_become_null(self):
+        ds = self.get(self.broken)
+        self.assertIsNone(ds.raw_data)
+        self.assertIsNone(ds.summary)
+
+    def test_native_values_are_untouched(self):
+        ds = self.get(self.native)
+        self.assertEqual(ds.raw_data, [RECORD])
+        self.assertEqual(ds.summary, {"total_count": 1})
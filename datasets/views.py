@@ -1,31 +1,81 @@
-import json
+import copy
 import logging
-
+import math
+import re
+import secrets
+import time
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
 from django.utils.timezone import localtime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import AllowAny
 
 from .models import Dataset
-from .analytics import analyze_equipment_json
+from .parsers import StreamingJSONArrayParser
+from .analytics import (
+    KEY_FLOW,
+    KEY_NAME,
+    KEY_PRESS,
+    KEY_TEMP,
+    KEY_TYPE,
+    analyze_equipment_json,
+    equipment_frame,
+    json_safe,
+    to_json,
+)
 
 logger = logging.getLogger(__name__)
 
+_NUMBER_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+HISTORY_CACHE_TIMEOUT = 60 * 60
+
+REQUIRED_FIELDS = [KEY_NAME, KEY_TYPE, KEY_FLOW, KEY_PRESS, KEY_TEMP]
+
+# Accepted input keys per canonical field, in priority order. Built once here
+# rather than as list literals rebuilt on every _normalize_equipment_record call.
+FIELD_ALIASES = {
+    KEY_NAME: (KEY_NAME, "name", "equipment_name", "EquipmentName", "equipmentName"),
+    KEY_TYPE: (KEY_TYPE, "type", "equipment_type", "equipmentType"),
+    KEY_FLOW: (KEY_FLOW, "flowrate", "Flow Rate", "flow_rate", "flowRate"),
+    KEY_PRESS: (KEY_PRESS, "pressure"),
+    KEY_TEMP: (KEY_TEMP, "temperature"),
+}
+
 
 def _to_float(x):
-    try:
-        if x is None:
+    # Exact type checks first: JSON numbers are the common case. Strings are
+    # screened by _NUMBER_RE so malformed input never raises and unwinds.
+    # NaN and +/-inf (e.g. an overflowing "1e999") count as missing, so they
+    # fail validation instead of reaching the analytics.
+    t = type(x)
+    if t is float:
+        return x if math.isfinite(x) else None
+    if t is int or t is bool:
+        try:
+            return float(x)
+        except OverflowError:
             return None
-        if isinstance(x, str) and x.strip() == "":
+    if t is str:
+        s = x.strip()
+        if not _NUMBER_RE.fullmatch(s):
             return None
-        return float(x)
-    except Exception:
-        return None
+        v = float(s)
+        return v if math.isfinite(v) else None
+    return None
 
 
-def _get_first_available(row: dict, keys: list):
+def _get_first_available(row: dict, keys: tuple):
     for key in keys:
         if key in row:
             return row[key]
@@ -36,176 +86,195 @@ def _normalize_equipment_record(row: dict):
     if not isinstance(row, dict):
         return None
 
-    name = _get_first_available(
-        row, ["Equipment Name", "name", "equipment_name", "EquipmentName", "equipmentName"]
-    )
-    typ = _get_first_available(row, ["Type", "type", "equipment_type", "equipmentType"])
-    flow = _get_first_available(row, ["Flowrate", "flowrate", "Flow Rate", "flow_rate", "flowRate"])
-    press = _get_first_available(row, ["Pressure", "pressure"])
-    temp = _get_first_available(row, ["Temperature", "temperature"])
+    name = _get_first_available(row, FIELD_ALIASES[KEY_NAME])
+    typ = _get_first_available(row, FIELD_ALIASES[KEY_TYPE])
+    flow = _get_first_available(row, FIELD_ALIASES[KEY_FLOW])
+    press = _get_first_available(row, FIELD_ALIASES[KEY_PRESS])
+    temp = _get_first_available(row, FIELD_ALIASES[KEY_TEMP])
 
     name_str = "" if name is None else str(name).strip()
     typ_str = "" if typ is None else str(typ).strip()
 
     return {
-        "Equipment Name": name_str,
-        "Type": typ_str,
-        "Flowrate": _to_float(flow),
-        "Pressure": _to_float(press),
-        "Temperature": _to_float(temp),
+        KEY_NAME: name_str,
+        KEY_TYPE: typ_str,
+        KEY_FLOW: _to_float(flow),
+        KEY_PRESS: _to_float(press),
+        KEY_TEMP: _to_float(temp),
     }
 
 
-def _parse_jsonish(value):
+def _missing_field_errors(df: pd.DataFrame):
     """
-    Accepts list/dict as-is. If string, tries json.loads.
-    Otherwise returns None.
+    Validates an `equipment_frame` of normalized records in one vectorized
+    pass. Returns a list of {"row", "error", "missing"} dicts, built only for
+    the rows that fail.
     """
-    if isinstance(value, (list, dict)):
-        return value
-    if isinstance(value, str):
-        s = value.strip()
-        if not s:
-            return None
-        try:
-            return json.loads(s)
-        except Exception:
-            return None
-    return None
+    # One (rows, fields) flag matrix filled straight from NumPy blocks. Names
+    # and types are stripped by _normalize_equipment_record, so "" is missing.
+    text = df[REQUIRED_FIELDS[:2]].to_numpy()
+    num = df[REQUIRED_FIELDS[2:]].to_numpy(dtype=np.float64)
+    flags = np.empty((len(df), len(REQUIRED_FIELDS)), dtype=bool)
+    flags[:, :2] = (text == "") | pd.isna(text)
+    np.isnan(num, out=flags[:, 2:])
+
+    bad = flags.any(axis=1)
+    if not bad.any():
+        return []
+
+    return [
+        {
+            "row": int(idx),
+            "error": "Missing/invalid fields",
+            "missing": [field for field, m in zip(REQUIRED_FIELDS, row_flags) if m],
+        }
+        for idx, row_flags in zip(np.flatnonzero(bad).tolist(), flags[bad].tolist())
+    ]
+
+
+# Chart keys the frontend expects on every dataset, with their empty values.
+_DEFAULT_SHAPE = {
+    "total_count": 0,
+    "avg_flowrate": None,
+    "avg_pressure": None,
+    "avg_temperature": None,
+    "type_distribution": {},
+    "scatter_points": [],
+    "histogram": {"labels": [], "flowrate": [], "temperature": []},
+    "boxplot": {"labels": [], "values": []},
+    "correlation": [],
+    "StatisticalSummary": {"data": {}},
+    "GroupedEquipmentAnalytics": {},
+    "DistributionAnalysis": {
+        "title": "Flowrate",
+        "unit": " m³/h",
+        "stats": {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []},
+    },
+    "CorrelationInsights": {"matrix": {}},
+    "ConditionalAnalysis": {
+        "conditionLabel": "Records with ABOVE average pressure",
+        "totalRecords": 0,
+        "stats": {"flowrate": None, "pressure": None, "temperature": None},
+    },
+    "EquipmentPerformanceRanking": {},
+    "data": [],
+}
 
 
 def _ensure_charts_grid_shape(dataset_id: int, summary: dict, fallback_total: int):
     s = summary if isinstance(summary, dict) else {}
-    out = {"id": int(dataset_id), **s}
-
-    out["total_count"] = int(out.get("total_count") or fallback_total)
-    out.setdefault("avg_flowrate", None)
-    out.setdefault("avg_pressure", None)
-    out.setdefault("avg_temperature", None)
-
-    out.setdefault("type_distribution", {})
+    out = {**_DEFAULT_SHAPE, **s, "id": int(dataset_id)}
 
-    out.setdefault("scatter_points", [])
-    out.setdefault("histogram", {"labels": [], "flowrate": [], "temperature": []})
-    out.setdefault("boxplot", {"labels": [], "values": []})
-    out.setdefault("correlation", [])
+    # Defaults are shared module state; hand out copies of any that were used.
+    # Complete summaries (the usual case) skip this loop entirely.
+    for key in _DEFAULT_SHAPE.keys() - s.keys():
+        out[key] = copy.deepcopy(_DEFAULT_SHAPE[key])
 
-    out.setdefault("StatisticalSummary", {"data": {}})
-    out.setdefault("GroupedEquipmentAnalytics", {})
-
-    out.setdefault(
-        "DistributionAnalysis",
-        {
-            "title": "Flowrate",
-            "unit": " m³/h",
-            "stats": {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []},
-        },
-    )
-    out.setdefault("CorrelationInsights", {"matrix": {}})
-    out.setdefault(
-        "ConditionalAnalysis",
-        {
-            "conditionLabel": "Records with ABOVE average pressure",
-            "totalRecords": 0,
-            "stats": {"flowrate": None, "pressure": None, "temperature": None},
-        },
-    )
-    out.setdefault("EquipmentPerformanceRanking", {})
-
-    out.setdefault("data", [])
+    out["total_count"] = int(s.get("total_count") or fallback_total)
     return out
 
 
 class UploadCSVView(APIView):
-    parser_classes = [JSONParser]
+    parser_classes = [StreamingJSONArrayParser]
     permission_classes = [AllowAny]
 
     def post(self, request):
+        # Checked before request.data so an oversized body is never parsed.
         try:
-            data = request.data
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > settings.MAX_UPLOAD_BYTES:
+            return Response(
+                {"error": f"Upload exceeds {settings.MAX_UPLOAD_BYTES} bytes"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
 
-            if not isinstance(data, list):
-                return Response(
-                    {"error": "Expected a JSON array of equipment records"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        data = request.data
 
-            if not data:
-                return Response(
-                    {"error": "Dataset cannot be empty"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        # An empty body never reaches the parser; DRF hands back {}.
+        if not isinstance(data, Iterator):
+            return Response(
+                {"error": "Expected a JSON array of equipment records"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            normalized = []
-            errors = []
+        # Records are normalized as they stream out of the parser, so only
+        # the normalized rows are ever held in memory. Normalization stays
+        # per row in Python (it beats building and re-exporting a
+        # DataFrame); the one frame built from its output is shared by
+        # validation and analytics.
+        normalized = []
+        errors = []
+        try:
             for idx, row in enumerate(data):
-                if not isinstance(row, dict):
+                # Stops reading as soon as the cap is passed, so a body
+                # without a Content-Length is bounded too.
+                if idx >= settings.MAX_UPLOAD_ROWS:
+                    return Response(
+                        {"error": f"Dataset exceeds {settings.MAX_UPLOAD_ROWS} records"},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                if isinstance(row, dict):
+                    normalized.append(_normalize_equipment_record(row))
+                else:
                     errors.append({"row": idx, "error": "Not a valid object"})
-                    continue
-
-                rec = _normalize_equipment_record(row)
-                if rec is None:
-                    errors.append({"row": idx, "error": "Could not be parsed"})
-                    continue
+        except ParseError as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
 
-                missing = [
-                    field
-                    for field in ["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature"]
-                    if rec.get(field) is None or (isinstance(rec.get(field), str) and not rec.get(field).strip())
-                ]
-
-                if missing:
-                    errors.append({"row": idx, "error": "Missing/invalid fields", "missing": missing})
-                    continue
+        if errors:
+            return Response(
+                {"error": "Validation failed for some records", "details": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-                normalized.append(rec)
+        if not normalized:
+            return Response(
+                {"error": "Dataset cannot be empty"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            if errors:
-                return Response(
-                    {"error": "Validation failed for some records", "details": errors},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        frame = equipment_frame(normalized)
+        errors = _missing_field_errors(frame)
+        if errors:
+            return Response(
+                {"error": "Validation failed for some records", "details": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            try:
-                summary = analyze_equipment_json(normalized)
-            except Exception as e:
-                logger.exception("Error analyzing equipment JSON")
-                return Response(
-                    {"error": "Failed to analyze dataset", "details": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
+        try:
+            summary = json_safe(analyze_equipment_json(normalized, frame=frame))
+        except Exception:
+            logger.exception("Error analyzing equipment JSON")
+            return Response(
+                {"error": "Failed to analyze dataset"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
-            try:
+        try:
+            with transaction.atomic():
                 dataset = Dataset.objects.create(
-                    name=f"dataset_{localtime().strftime('%Y%m%d_%H%M%S')}",
-                    raw_data=json.dumps(normalized),
-                    summary=json.dumps(summary),
-                )
-            except Exception as e:
-                logger.exception("Error saving dataset to database")
-                return Response(
-                    {"error": "Failed to save dataset", "details": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            try:
-                # Keep the latest 5 datasets, delete older ones.
-                pks_to_keep = list(
-                    Dataset.objects.order_by("-uploaded_at").values_list("pk", flat=True)[:5]
+                    # Django sets the process TZ from TIME_ZONE, so plain
+                    # time.strftime gives the same local stamp. The random
+                    # suffix keeps same-second uploads apart.
+                    name=f"dataset_{time.strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}",
+                    raw_data=normalized,
+                    summary=summary,
                 )
-                Dataset.objects.exclude(pk__in=pks_to_keep).delete()
-            except Exception:
-                logger.exception("Error deleting old datasets")
-
-            return Response({"id": dataset.id, **summary}, status=status.HTTP_201_CREATED)
-
-        except Exception as e:
-            logger.exception("Unexpected error in UploadCSVView")
+                # Keep the latest 5 datasets; older ones go in a single
+                # DELETE ... WHERE id IN (subquery).
+                Dataset.objects.filter(
+                    pk__in=Dataset.objects.order_by("-uploaded_at").values_list("pk", flat=True)[5:]
+                ).delete()
+        except Exception:
+            logger.exception("Error saving dataset to database")
             return Response(
-                {"error": "An unexpected error occurred", "details": str(e)},
+                {"error": "Failed to save dataset"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+        return Response({"id": dataset.id, **summary}, status=status.HTTP_201_CREATED)
+
 
 class DatasetHistoryView(APIView):
     permission_classes = [AllowAny]
@@ -222,67 +291,66 @@ class DatasetHistoryView(APIView):
 
         limit = max(1, min(5, limit))
 
-        try:
-            qs = Dataset.objects.order_by("-uploaded_at")[:limit]
-        except Exception as e:
-            logger.exception("Failed to query dataset history")
-            return Response(
-                {"error": f"An error occurred while retrieving datasets. {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        # One entry per limit holding (version, body). Any upload, summary
+        # rewrite (updated_at is auto_now) or delete changes the version, so a
+        # stale body is never served, and it is overwritten rather than left
+        # behind under an old key. The version comes from the database, so
+        # this also holds for writes made by other processes.
+        agg = Dataset.objects.aggregate(latest=Max("updated_at"), total=Count("pk"))
+        version = (agg["latest"].timestamp() if agg["latest"] else 0, agg["total"])
+        cache_key = f"datasets:history:{limit}"
+        cached = cache.get(cache_key)
+        if cached is not None and cached[0] == version:
+            return HttpResponse(cached[1], content_type="application/json", status=status.HTTP_200_OK)
+
+        # Plain dicts rather than model instances, streamed without filling the
+        # queryset's result cache.
+        rows = (
+            Dataset.objects.order_by("-uploaded_at")
+            .values("id", "name", "uploaded_at", "raw_data", "summary")[:limit]
+            .iterator(chunk_size=limit)
+        )
 
         datasets_obj = {}
         order = []
 
-        for d in qs:
+        for d in rows:
             try:
-                raw_value = getattr(d, "raw_data", None)
-                raw_parsed = _parse_jsonish(raw_value)
-                raw_list = raw_parsed if isinstance(raw_parsed, list) else []
-
-                normalized = []
-                for row in raw_list:
-                    rec = _normalize_equipment_record(row)
-                    if rec is not None:
-                        normalized.append(rec)
-
-                summary_value = getattr(d, "summary", None)
-                summary_parsed = _parse_jsonish(summary_value)
-                summary = summary_parsed if isinstance(summary_parsed, dict) else {}
-
-                if (not summary) or int(summary.get("total_count") or 0) == 0:
-                    if normalized:
-                        try:
-                            summary = analyze_equipment_json(normalized)
-                        except Exception:
-                            logger.exception("Failed to re-analyze dataset %s", d.id)
-                            summary = summary or {}
+                # UploadCSVView stores records already normalized, so they are
+                # served as-is rather than re-normalized on every request.
+                # JSONField hands back parsed objects; no json.loads here.
+                raw_data = d["raw_data"]
+                normalized = raw_data if isinstance(raw_data, list) else []
+                # Missing summaries are filled in by `manage.py backfill_summaries`,
+                # not recomputed per request.
+                summary = d["summary"] if isinstance(d["summary"], dict) else {}
 
                 dataset_payload = _ensure_charts_grid_shape(
-                    d.id, summary, fallback_total=len(normalized)
+                    d["id"], summary, fallback_total=len(normalized)
                 )
                 dataset_payload["data"] = normalized
 
+                uploaded_at = d["uploaded_at"]
                 meta = {
-                    "name": getattr(d, "name", None),
-                    "uploaded_at": localtime(d.uploaded_at).isoformat() if getattr(d, "uploaded_at", None) else None,
+                    "name": d["name"],
+                    "uploaded_at": localtime(uploaded_at).isoformat() if uploaded_at else None,
                 }
 
-                if getattr(d, "file", None):
-                    try:
-                        meta["file_size"] = d.file.size
-                    except Exception:
-                        meta["file_size"] = None
-
-                datasets_obj[str(d.id)] = {
+                datasets_obj[str(d["id"])] = {
                     "dataset": dataset_payload,
                     "data": normalized,
                     "meta": meta,
                 }
-                order.append(int(d.id))
+                order.append(int(d["id"]))
 
             except Exception:
-                logger.exception("Failed to serialize dataset %s", getattr(d, "id", "unknown"))
+                logger.exception("Failed to serialize dataset %s", d.get("id", "unknown"))
                 continue
 
-        return Response({"count": len(order), "order": order, "datasets": datasets_obj}, status=status.HTTP_200_OK)
+        body = to_json({"count": len(order), "order": order, "datasets": datasets_obj})
+        if len(body) <= settings.HISTORY_CACHE_MAX_BYTES:
+            cache.set(cache_key, (version, body), HISTORY_CACHE_TIMEOUT)
+        else:
+            # Too big to keep; also drop any older entry it would have replaced.
+            cache.delete(cache_key)
+        return HttpResponse(body, content_type="application/json", status=status.HTTP_200_OK)
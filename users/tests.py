@@ -1,3 +1,47 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+
+def throttle_rates(**rates):
+    return override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"login": "10/min", "login_ip": "30/min", **rates},
+        }
+    )
+
+
+class LoginThrottleTests(TestCase):
+    """LoginView's per-account and per-IP throttles."""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="alice", email="alice@example.com", password="Zebra-Quartz-91")
+
+    def login(self, body):
+        return self.client.post("/api/auth/login/", data=json.dumps(body), content_type="application/json")
+
+    def test_list_body_is_rejected_not_500(self):
+        response = self.login([1, 2])
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["error"], "Invalid credentials")
+
+    @throttle_rates()
+    def test_eleventh_attempt_for_one_username_is_throttled(self):
+        codes = [self.login({"username": "alice", "password": "wrong"}).status_code for _ in range(11)]
+        self.assertEqual(codes, [401] * 10 + [429])
+
+    @throttle_rates(login_ip="3/min")
+    def test_ip_limit_applies_across_usernames(self):
+        codes = [self.login({"username": f"user{i}", "password": "wrong"}).status_code for i in range(4)]
+        self.assertEqual(codes, [401, 401, 401, 429])
+
+    @throttle_rates()
+    def test_successful_login(self):
+        response = self.login({"username": "alice", "password": "Zebra-Quartz-91"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], "alice")
@@ -0,0 +1,43 @@
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class _SettingsRateThrottle(SimpleRateThrottle):
+    """
+    Reads the rate from the current DEFAULT_THROTTLE_RATES on each request;
+    SimpleRateThrottle.THROTTLE_RATES is bound once at import and misses
+    setting overrides.
+    """
+
+    def get_rate(self):
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+
+class LoginRateThrottle(_SettingsRateThrottle):
+    """
+    Limits login attempts per client IP and username, so one account can't be
+    brute-forced before any password hash is computed.
+    """
+
+    scope = "login"
+
+    def get_cache_key(self, request, view):
+        data = request.data if isinstance(request.data, dict) else {}
+        username = str(data.get("username") or "").strip().lower()[:150]
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": f"{self.get_ident(request)}:{username}",
+        }
+
+
+class LoginIPRateThrottle(_SettingsRateThrottle):
+    """
+    Limits login attempts per client IP across all usernames, so spraying
+    many usernames from one address is throttled too.
+    """
+
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
@@ -6,6 +6,7 @@ from django.contrib.auth.models import User
 from .serializers import RegisterSerializer, LoginSerializer
 from rest_framework.permissions import IsAuthenticated
 from .authentication import CsrfExemptSessionAuthentication
+from .throttling import LoginIPRateThrottle, LoginRateThrottle
 from rest_framework.permissions import AllowAny
 
 class RegisterView(APIView):
@@ -13,80 +14,57 @@ class RegisterView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request):
-        try:
-            serializer = RegisterSerializer(data=request.data)
-            if serializer.is_valid():
-                password = serializer.validated_data.get('password')
-                if len(password) < 8:
-                    return Response(
-                        {"error": "Password must be at least 8 characters long"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                serializer.save()
-                return Response(
-                    {"message": "User registered successfully"},
-                    status=status.HTTP_201_CREATED
-                )
+        serializer = RegisterSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
             return Response(
-                {"errors": serializer.errors},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        except Exception as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"message": "User registered successfully"},
+                status=status.HTTP_201_CREATED
             )
+        return Response(
+            {"errors": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 class LoginView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPRateThrottle, LoginRateThrottle]
 
     def post(self, request):
-        try:
-            serializer = LoginSerializer(data=request.data)
-
-            if not serializer.is_valid():
-                return Response(
-                    {
-                        "error": "Invalid credentials",
-                        "details": serializer.errors
-                    },
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-
-            user = serializer.validated_data["user"]
-
-            login(request, user)
+        serializer = LoginSerializer(data=request.data)
 
+        if not serializer.is_valid():
             return Response(
                 {
-                    "message": "Login successful",
-                    "username": user.username
+                    "error": "Invalid credentials",
+                    "details": serializer.errors
                 },
-                status=status.HTTP_200_OK
-            )
-        except Exception as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                status=status.HTTP_401_UNAUTHORIZED
             )
 
+        user = serializer.validated_data["user"]
+
+        login(request, user)
+
+        return Response(
+            {
+                "message": "Login successful",
+                "username": user.username
+            },
+            status=status.HTTP_200_OK
+        )
+
 class LogoutView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]
     permission_classes = [AllowAny]
 
     def post(self, request):
-        try:
-            logout(request)
-            return Response(
-                {"message": "Logged out successfully"},
-                status=status.HTTP_200_OK
-            )
-        except Exception as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        logout(request)
+        return Response(
+            {"message": "Logged out successfully"},
+            status=status.HTTP_200_OK
+        )
 
 class MeView(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication]